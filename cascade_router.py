@@ -12,15 +12,48 @@ Real-World Impact:
 """
 
 import os
-from typing import Dict, Tuple
+import re
+import asyncio
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from enum import Enum
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from semantic_cache import SemanticIndex
+
 # Load environment variables
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+# Complexity signals, built once at import (hashed token lookups per query)
+_COMPLEX_INDICATORS = frozenset({
+    'explain', 'analyze', 'compare', 'evaluate',
+    'synthesize', 'architecture', 'design'
+})
+_SIMPLE_INDICATORS = frozenset({
+    'when', 'who', 'where', 'define', 'list', 'name'
+})
+# Word tokens; punctuation never sticks to a word ("explain," → "explain")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Multi-word signals can't be matched per token; compile them into a single
+# alternation so the query is scanned once however many phrases are listed
+_SIMPLE_PHRASES = ('what is', 'how many')
+_SIMPLE_PHRASE_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, sorted(_SIMPLE_PHRASES, key=len, reverse=True))) + r")\b"
+)
+
+EMBEDDING_MODEL = 'models/gemini-embedding-001'
+SEMANTIC_CACHE_THRESHOLD = 0.92
+# Per-tier entry caps; the oldest / least recently used entries are evicted
+EXACT_CACHE_MAX_ENTRIES = 1024
+SEMANTIC_CACHE_MAX_ENTRIES = 1024
+
+def _to_milli(dollars: float) -> int:
+    """Dollars → integer tenths of a cent (exact bookkeeping unit)"""
+    return round(dollars * 1000)
+
 class QueryComplexity(Enum):
     """Query complexity tiers with associated costs"""
     SIMPLE = ("flash", 0.001)   # 68% of queries
@@ -30,6 +63,15 @@ class QueryComplexity(Enum):
     def __init__(self, model_name: str, cost_per_query: float):
         self.model_name = model_name
         self.cost_per_query = cost_per_query
+        self.cost_milli = _to_milli(cost_per_query)
+
+# Hot-path tables indexed by tier id (declaration order above). Tuple
+# indexing skips Enum hashing and the comparatively slow Enum.name lookup.
+_TIERS = tuple(QueryComplexity)
+_TIER_NAMES = tuple(c.name for c in _TIERS)
+_TIER_COSTS = tuple(c.cost_per_query for c in _TIERS)
+_TIER_COST_MILLI = tuple(c.cost_milli for c in _TIERS)
+_SIMPLE_ID, _MEDIUM_ID, _COMPLEX_ID = range(len(_TIERS))
 
 class CascadeRouter:
     """
@@ -39,28 +81,70 @@ class CascadeRouter:
     1. Complexity-based routing (simple → flash, complex → pro)
     2. Token budget enforcement (prevent runaway costs)
     3. Performance tracking (for ROI reporting)
+    4. Response cache (exact, plus opt-in semantic) in front of every model call
     """
     
-    def __init__(self, session_budget: float = 100.0):
+    __slots__ = (
+        '_budget_milli', '_cost_milli', '_reserved_milli', 'query_count',
+        'routing_stats', 'flash_model', 'pro_model', '_dispatch', '_meta_proto',
+        '_exact_cache', '_semantic_cache'
+    )
+    
+    def __init__(self, session_budget: float = 100.0, semantic_cache: bool = False):
         """
         Initialize router with financial guardrails
         
         Args:
             session_budget: Maximum spend per session ($)
+            semantic_cache: Also reuse answers for paraphrased queries.
+                Off by default: each exact-cache miss that passes the
+                budget check then costs one embedding round-trip before
+                the model call.
         """
-        self.session_budget = session_budget
-        self.session_cost = 0.0
+        # Spend is tracked in integer tenths of a cent: no float drift
+        self._budget_milli = _to_milli(session_budget)
+        self._cost_milli = 0
+        # Cost of async calls still in flight; counts against the budget
+        # but is not part of session_cost until the call succeeds
+        self._reserved_milli = 0
         self.query_count = 0
-        self.routing_stats = {
+        self.routing_stats = Counter({
             'flash': 0,
             'pro': 0,
             'gpt4': 0
-        }
+        })
         
         # Initialize models
         self.flash_model = genai.GenerativeModel('gemini-2.0-flash-exp')
         self.pro_model = genai.GenerativeModel('gemini-1.5-pro')
         
+        # Tier id → (model, tier), built once instead of branching per query.
+        # In production COMPLEX would route to GPT-4; for demo purposes,
+        # Pro serves as the highest tier.
+        self._dispatch = (
+            (self.flash_model, 'flash'),   # SIMPLE
+            (self.pro_model, 'pro'),       # MEDIUM
+            (self.pro_model, 'gpt4')       # COMPLEX
+        )
+        
+        # Per-tier success metadata; only session_cost varies per query
+        self._meta_proto = tuple(
+            {
+                'status': 'success',
+                'tier': tier,
+                'cost': _TIER_COSTS[tier_id],
+                'complexity': _TIER_NAMES[tier_id]
+            }
+            for tier_id, (_, tier) in enumerate(self._dispatch)
+        )
+        
+        # Response cache: exact hash first, then embedding similarity
+        self._exact_cache: "OrderedDict[bytes, str]" = OrderedDict()  # LRU order
+        self._semantic_cache = (
+            SemanticIndex(SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES)
+            if semantic_cache else None
+        )
+        
     def analyze_complexity(self, query: str) -> QueryComplexity:
         """
         Classify query complexity using lightweight heuristics
@@ -68,27 +152,40 @@ class CascadeRouter:
         Production Note: In real deployment, this would use a
         fine-tuned classifier (BERT/etc) trained on historical data.
         """
+        return _TIERS[self._classify(query)]
+    
+    def _classify(self, query: str) -> int:
+        """analyze_complexity as a tier id (index into the _TIER_* tables)"""
         query_lower = query.lower()
-        word_count = len(query.split())
+        # Length counts whitespace-separated words (any script); the regex
+        # tokens are only for indicator membership
+        tokens = _TOKEN_RE.findall(query_lower)
         
         # Simple heuristics (replace with ML classifier in production)
-        complex_indicators = [
-            'explain', 'analyze', 'compare', 'evaluate', 
-            'synthesize', 'architecture', 'design'
-        ]
-        
-        simple_indicators = [
-            'what is', 'when', 'who', 'where', 'define',
-            'list', 'name', 'how many'
-        ]
-        
-        # Complexity scoring
-        if word_count > 30 or any(word in query_lower for word in complex_indicators):
-            return QueryComplexity.COMPLEX
-        elif any(word in query_lower for word in simple_indicators):
-            return QueryComplexity.SIMPLE
+        if len(query.split()) > 30 or not _COMPLEX_INDICATORS.isdisjoint(tokens):
+            return _COMPLEX_ID
+        elif not _SIMPLE_INDICATORS.isdisjoint(tokens) or _SIMPLE_PHRASE_RE.search(query_lower):
+            return _SIMPLE_ID
         else:
-            return QueryComplexity.MEDIUM
+            return _MEDIUM_ID
+    
+    @property
+    def session_budget(self) -> float:
+        """Maximum spend per session ($)"""
+        return self._budget_milli / 1000
+    
+    @session_budget.setter
+    def session_budget(self, dollars: float):
+        self._budget_milli = _to_milli(dollars)
+    
+    @property
+    def session_cost(self) -> float:
+        """Spend so far this session ($)"""
+        return self._cost_milli / 1000
+    
+    @session_cost.setter
+    def session_cost(self, dollars: float):
+        self._cost_milli = _to_milli(dollars)
     
     def check_budget(self, estimated_cost: float) -> bool:
         """
@@ -97,9 +194,89 @@ class CascadeRouter:
         Returns:
             True if request allowed, False if budget exceeded
         """
-        if self.session_cost + estimated_cost > self.session_budget:
-            return False
-        return True
+        return self._within_budget(_to_milli(estimated_cost))
+    
+    def _within_budget(self, cost_milli: int) -> bool:
+        """check_budget for a cost already in tenths of a cent"""
+        return self._cost_milli + self._reserved_milli + cost_milli <= self._budget_milli
+    
+    def _embed(self, query: str) -> Optional[Sequence[float]]:
+        """Embed query for semantic lookup (None if the call fails)"""
+        try:
+            return genai.embed_content(model=EMBEDDING_MODEL, content=query)['embedding']
+        except Exception:
+            # The cache is an optimization; never fail a request over it
+            return None
+    
+    def _exact_lookup(self, query: str) -> Tuple[Optional[str], bytes]:
+        """
+        Check the exact-match cache (local, no API call)
+        
+        Returns:
+            (cached_response or None, exact_key)
+        """
+        key = hashlib.blake2b(query.encode()).digest()
+        cached = self._exact_cache.get(key)
+        if cached is not None:
+            self._exact_cache.move_to_end(key)
+        return cached, key
+    
+    def _semantic_lookup(self, query: str) -> Tuple[Optional[str], Optional[Sequence[float]]]:
+        """
+        Check the semantic cache (one embedding call)
+        
+        Returns:
+            (cached_response or None, query_embedding or None)
+        """
+        if self._semantic_cache is None:
+            return None, None
+        embedding = self._embed(query)
+        if embedding is None:
+            return None, None
+        return self._semantic_cache.search(embedding), embedding
+    
+    def _cache_store(self, key: bytes, embedding: Optional[Sequence[float]], response_text: str):
+        """Write a fresh model response back to both cache tiers"""
+        self._exact_cache[key] = response_text
+        self._exact_cache.move_to_end(key)
+        if len(self._exact_cache) > EXACT_CACHE_MAX_ENTRIES:
+            self._exact_cache.popitem(last=False)
+        if self._semantic_cache is not None and embedding is not None:
+            self._semantic_cache.add(embedding, response_text)
+    
+    def _cache_hit_result(self, cached: str) -> Tuple[str, Dict]:
+        return (
+            cached,
+            {
+                'status': 'cache_hit',
+                'tier': 'cache',
+                'cost': 0.0,
+                'session_cost': self.session_cost
+            }
+        )
+    
+    def _budget_exceeded_result(self) -> Tuple[str, Dict]:
+        return (
+            "⚠️ Session budget exceeded. Please start new session.",
+            {
+                'status': 'budget_exceeded',
+                'session_cost': self.session_cost,
+                'budget_limit': self.session_budget
+            }
+        )
+    
+    def _success_result(self, response_text: str, tier_id: int) -> Tuple[str, Dict]:
+        return response_text, {**self._meta_proto[tier_id], 'session_cost': self.session_cost}
+    
+    @staticmethod
+    def _error_result(e: Exception) -> Tuple[str, Dict]:
+        return (
+            f"Error generating response: {str(e)}",
+            {
+                'status': 'error',
+                'error_message': str(e)
+            }
+        )
     
     def route_query(self, query: str) -> Tuple[str, Dict]:
         """
@@ -108,62 +285,155 @@ class CascadeRouter:
         Returns:
             (response_text, metadata_dict)
         """
+        # Step 0: Serve exact repeats from cache (no model call, no charge)
+        cached, cache_key = self._exact_lookup(query)
+        if cached is not None:
+            return self._cache_hit_result(cached)
+        
         # Step 1: Analyze complexity
-        complexity = self.analyze_complexity(query)
+        tier_id = self._classify(query)
         
         # Step 2: Check budget (circuit breaker)
-        if not self.check_budget(complexity.cost_per_query):
-            return (
-                "⚠️ Session budget exceeded. Please start new session.",
-                {
-                    'status': 'budget_exceeded',
-                    'session_cost': self.session_cost,
-                    'budget_limit': self.session_budget
-                }
-            )
+        if not self._within_budget(_TIER_COST_MILLI[tier_id]):
+            return self._budget_exceeded_result()
+        
+        # Step 2b: Paraphrase of a cached query? (embedding call, so only
+        # made once the budget would allow the model call anyway)
+        cached, embedding = self._semantic_lookup(query)
+        if cached is not None:
+            return self._cache_hit_result(cached)
         
         # Step 3: Route to appropriate tier
         try:
-            if complexity == QueryComplexity.SIMPLE:
-                model = self.flash_model
-                tier = 'flash'
-            elif complexity == QueryComplexity.MEDIUM:
-                model = self.pro_model
-                tier = 'pro'
-            else:  # COMPLEX
-                # In production, this would route to GPT-4
-                # For demo purposes, using Pro as highest tier
-                model = self.pro_model
-                tier = 'gpt4'
+            model, tier = self._dispatch[tier_id]
             
             # Generate response
             response = model.generate_content(query)
             response_text = response.text
+            self._cache_store(cache_key, embedding, response_text)
             
             # Update metrics
-            self.session_cost += complexity.cost_per_query
+            self._cost_milli += _TIER_COST_MILLI[tier_id]
             self.query_count += 1
             self.routing_stats[tier] += 1
             
-            return (
-                response_text,
-                {
-                    'status': 'success',
-                    'tier': tier,
-                    'cost': complexity.cost_per_query,
-                    'session_cost': self.session_cost,
-                    'complexity': complexity.name
-                }
-            )
+            return self._success_result(response_text, tier_id)
             
         except Exception as e:
-            return (
-                f"Error generating response: {str(e)}",
-                {
-                    'status': 'error',
-                    'error_message': str(e)
-                }
-            )
+            return self._error_result(e)
+    
+    def route_query_stream(self, query: str) -> Iterator[str]:
+        """
+        Streaming variant of route_query
+        
+        Yields response text as the model produces it, so callers can
+        render the first tokens after one round-trip instead of waiting
+        for the full answer. Cost and routing stats are recorded when the
+        stream ends (or is closed early, since the call was still billed).
+        
+        Yields:
+            Response text chunks
+        """
+        cached, cache_key = self._exact_lookup(query)
+        if cached is not None:
+            yield cached
+            return
+        
+        tier_id = self._classify(query)
+        if not self._within_budget(_TIER_COST_MILLI[tier_id]):
+            yield self._budget_exceeded_result()[0]
+            return
+        
+        cached, embedding = self._semantic_lookup(query)
+        if cached is not None:
+            yield cached
+            return
+        
+        model, tier = self._dispatch[tier_id]
+        chunks = []
+        try:
+            for chunk in model.generate_content(query, stream=True):
+                chunks.append(chunk.text)
+                yield chunk.text
+        except Exception as e:
+            yield self._error_result(e)[0]
+            return
+        finally:
+            if chunks:
+                self._cost_milli += _TIER_COST_MILLI[tier_id]
+                self.query_count += 1
+                self.routing_stats[tier] += 1
+        
+        self._cache_store(cache_key, embedding, "".join(chunks))
+    
+    async def _semantic_lookup_async(self, query: str) -> Tuple[Optional[str], Optional[Sequence[float]]]:
+        """Async variant of _semantic_lookup (embedding call is awaited)"""
+        if self._semantic_cache is None:
+            return None, None
+        
+        try:
+            embedding = (await genai.embed_content_async(model=EMBEDDING_MODEL, content=query))['embedding']
+        except Exception:
+            return None, None
+        return self._semantic_cache.search(embedding), embedding
+    
+    async def route_query_async(self, query: str) -> Tuple[str, Dict]:
+        """
+        Async variant of route_query
+        
+        Awaits the model call so several queries can be in flight at
+        once (see route_queries_async). The budget check and the cost
+        reservation run with no await in between, so concurrent queries
+        on the event loop can't race past the budget.
+        
+        Returns:
+            (response_text, metadata_dict)
+        """
+        cached, cache_key = self._exact_lookup(query)
+        if cached is not None:
+            return self._cache_hit_result(cached)
+        
+        tier_id = self._classify(query)
+        model, tier = self._dispatch[tier_id]
+        if not self._within_budget(_TIER_COST_MILLI[tier_id]):
+            return self._budget_exceeded_result()
+        
+        cached, embedding = await self._semantic_lookup_async(query)
+        if cached is not None:
+            return self._cache_hit_result(cached)
+        
+        # Reserve the cost up front: in-flight queries count against the budget
+        # (re-checked, since the semantic lookup above may have awaited)
+        cost_milli = _TIER_COST_MILLI[tier_id]
+        if not self._within_budget(cost_milli):
+            return self._budget_exceeded_result()
+        self._reserved_milli += cost_milli
+        
+        try:
+            response = await model.generate_content_async(query)
+            response_text = response.text
+        except Exception as e:
+            return self._error_result(e)
+        finally:
+            self._reserved_milli -= cost_milli
+        
+        # Commit only on success; session_cost never includes reservations
+        self._cost_milli += cost_milli
+        self.query_count += 1
+        self.routing_stats[tier] += 1
+        self._cache_store(cache_key, embedding, response_text)
+        return self._success_result(response_text, tier_id)
+    
+    async def route_queries_async(self, queries: Sequence[str]) -> List[Tuple[str, Dict]]:
+        """
+        Route a batch of queries concurrently
+        
+        Wall-clock time is roughly the slowest call instead of the sum.
+        
+        Returns:
+            List of (response_text, metadata_dict), in input order
+        """
+        return list(await asyncio.gather(*(self.route_query_async(q) for q in queries)))
     
     def get_session_report(self) -> Dict:
         """
@@ -172,16 +442,17 @@ class CascadeRouter:
         Returns ROI metrics for stakeholder reporting
         """
         # Calculate what this session would have cost with GPT-4 only
-        baseline_cost = self.query_count * 0.15  # GPT-4 rate
+        baseline_milli = self.query_count * _TIER_COST_MILLI[_COMPLEX_ID]
+        savings_milli = baseline_milli - self._cost_milli
         
         return {
             'queries_processed': self.query_count,
-            'total_cost': round(self.session_cost, 2),
-            'baseline_cost': round(baseline_cost, 2),
-            'savings': round(baseline_cost - self.session_cost, 2),
-            'savings_percent': round((1 - self.session_cost/baseline_cost) * 100, 1) if baseline_cost > 0 else 0,
-            'routing_distribution': self.routing_stats,
-            'budget_remaining': round(self.session_budget - self.session_cost, 2)
+            'total_cost': self._cost_milli / 1000,
+            'baseline_cost': baseline_milli / 1000,
+            'savings': savings_milli / 1000,
+            'savings_percent': round(savings_milli * 100 / baseline_milli, 1) if baseline_milli > 0 else 0,
+            'routing_distribution': dict(self.routing_stats),
+            'budget_remaining': (self._budget_milli - self._cost_milli) / 1000
         }
 
 # Example usage
@@ -198,10 +469,11 @@ if __name__ == "__main__":
     
     print("=== Cascade Router Demo ===\n")
     
-    for i, query in enumerate(test_queries, 1):
+    # Queries are independent, so issue them concurrently
+    results = asyncio.run(router.route_queries_async(test_queries))
+    
+    for i, (query, (response, metadata)) in enumerate(zip(test_queries, results), 1):
         print(f"\n[Query {i}]: {query}")
-        response, metadata = router.route_query(query)
-        
         print(f"Routed to: {metadata.get('tier', 'N/A')}")
         print(f"Cost: ${metadata.get('cost', 0):.3f}")
         print(f"Response: {response[:100]}...")
@@ -1,15 +1,27 @@
 import os
+import httpx
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=api_key)
 
-print("🔍 Scanning available models...")
-try:
-    # פשוט מדפיס את השם של כל מודל שנמצא
-    for model in client.models.list():
-        print(f"✅ Found: {model.name}")
-except Exception as e:
-    print(f"❌ Error: {e}")
\ No newline at end of file
+# Single client per process; pooled keep-alive connections are reused across
+# calls instead of paying a fresh TLS handshake each time
+_CLIENT = genai.Client(
+    api_key=api_key,
+    http_options=types.HttpOptions(
+        timeout=60_000,  # ms
+        client_args={"limits": httpx.Limits(max_connections=32, max_keepalive_connections=16)},
+    ),
+)
+
+if __name__ == "__main__":
+    print("🔍 Scanning available models...")
+    try:
+        # פשוט מדפיס את השם של כל מודל שנמצא
+        for model in _CLIENT.models.list():
+            print(f"✅ Found: {model.name}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
@@ -10,11 +10,11 @@ Usage:
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import time
-import random
 
 # Page config
 st.set_page_config(
@@ -77,6 +77,131 @@ reflection_metrics = {
     'compliance_rate': 99.8
 }
 
+@st.cache_data
+def load_chart_data():
+    """Static chart datasets, built once instead of on every script rerun"""
+    return {
+        'monthly': pd.DataFrame({
+            'Month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
+            'Baseline (GPT-4 only)': [2500, 2650, 2800, 2950, 3100, 3250],
+            'Optimized (Cascade)': [520, 485, 510, 475, 490, 465]
+        }),
+        'distribution': pd.DataFrame({
+            'Model': ['Flash (Simple)', 'Pro (Medium)', 'GPT-4 (Complex)'],
+            'Percentage': [68, 27, 5],
+            'Queries': [34000, 13500, 2500],
+            'Cost': [34, 270, 375]
+        }),
+        'response': pd.DataFrame({
+            'Category': ['Simple', 'Medium', 'Complex'],
+            'Before': [2.3, 3.1, 5.2],
+            'After': [0.8, 1.5, 4.8]
+        }),
+        'issues': pd.DataFrame({
+            'Issue Type': ['Format Violations', 'Missing Headers', 'Incomplete Sections', 'Safety Issues'],
+            'Detected': [187, 94, 31, 23],
+            'Fixed': [187, 94, 31, 23]
+        }),
+        'iteration': pd.DataFrame({
+            'Iterations': ['1 (Perfect)', '2', '3+'],
+            'Percentage': [72, 23, 5]
+        })
+    }
+
+chart_data = load_chart_data()
+
+@st.cache_data
+def build_trend_fig(monthly_data):
+    """Monthly cost trend: baseline vs cascade"""
+    fig_trend = go.Figure()
+    fig_trend.add_trace(go.Scatter(
+        x=monthly_data['Month'],
+        y=monthly_data['Baseline (GPT-4 only)'],
+        mode='lines+markers',
+        name='Before',
+        line=dict(color='#ef4444', width=3),
+        marker=dict(size=10)
+    ))
+    fig_trend.add_trace(go.Scatter(
+        x=monthly_data['Month'],
+        y=monthly_data['Optimized (Cascade)'],
+        mode='lines+markers',
+        name='After',
+        line=dict(color='#10b981', width=3),
+        marker=dict(size=10)
+    ))
+    
+    fig_trend.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+        height=300
+    )
+    return fig_trend
+
+@st.cache_data
+def build_distribution_fig(distribution_data):
+    """Share of queries per model tier"""
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=distribution_data['Model'],
+        values=distribution_data['Percentage'],
+        hole=.4,
+        marker=dict(colors=['#10b981', '#3b82f6', '#f59e0b']),
+        textinfo='label+percent',
+        textfont=dict(color='white')
+    )])
+    
+    fig_pie.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        height=300,
+        showlegend=True
+    )
+    return fig_pie
+
+@st.cache_data
+def build_response_fig(response_data):
+    """Response time before/after, per category"""
+    fig_response = go.Figure(data=[
+        go.Bar(name='Before', x=response_data['Category'], y=response_data['Before'], marker_color='#ef4444'),
+        go.Bar(name='After', x=response_data['Category'], y=response_data['After'], marker_color='#10b981')
+    ])
+    
+    fig_response.update_layout(
+        barmode='group',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', title='Seconds'),
+        height=300
+    )
+    return fig_response
+
+@st.cache_data
+def build_iteration_fig(iteration_data):
+    """Reflection iterations until compliance"""
+    fig_iter = go.Figure(data=[go.Bar(
+        x=iteration_data['Iterations'],
+        y=iteration_data['Percentage'],
+        marker_color=['#10b981', '#f59e0b', '#ef4444'],
+        text=iteration_data['Percentage'].apply(lambda x: f"{x}%"),
+        textposition='auto'
+    )])
+    
+    fig_iter.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False, title='Number of Iterations'),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', title='Percentage'),
+        height=300
+    )
+    return fig_iter
+
 # Header
 st.title("🚀 AI Architecture Portfolio")
 st.markdown("### Enterprise-Grade Cognitive Systems & Cost Optimization")
@@ -138,12 +263,15 @@ with tab1:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for i in range(100):
-                time.sleep(0.05)
-                st.session_state.query_count = i + 1
-                st.session_state.total_savings += random.uniform(0.10, 0.20)
-                progress_bar.progress(i + 1)
-                status_text.text(f"Processing query {i+1}/100...")
+            # Whole savings trajectory in one call; UI refreshed every 10 queries
+            savings = np.random.uniform(0.10, 0.20, size=100).cumsum()
+            for done in range(10, 101, 10):
+                time.sleep(0.2)
+                progress_bar.progress(done)
+                status_text.text(f"Processing query {done}/100... (${savings[done - 1]:.2f} saved)")
+            
+            st.session_state.query_count = 100
+            st.session_state.total_savings = float(savings[-1])
             
             st.session_state.simulation_running = False
             st.success("✅ Simulation Complete!")
@@ -168,66 +296,17 @@ with tab1:
     with col_chart1:
         st.markdown("### 📊 Monthly Cost Trend")
         
-        monthly_data = pd.DataFrame({
-            'Month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
-            'Baseline (GPT-4 only)': [2500, 2650, 2800, 2950, 3100, 3250],
-            'Optimized (Cascade)': [520, 485, 510, 475, 490, 465]
-        })
-        
-        fig_trend = go.Figure()
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_data['Month'],
-            y=monthly_data['Baseline (GPT-4 only)'],
-            mode='lines+markers',
-            name='Before',
-            line=dict(color='#ef4444', width=3),
-            marker=dict(size=10)
-        ))
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_data['Month'],
-            y=monthly_data['Optimized (Cascade)'],
-            mode='lines+markers',
-            name='After',
-            line=dict(color='#10b981', width=3),
-            marker=dict(size=10)
-        ))
+        monthly_data = chart_data['monthly']
         
-        fig_trend.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-            height=300
-        )
+        fig_trend = build_trend_fig(monthly_data)
         st.plotly_chart(fig_trend, use_container_width=True)
     
     with col_chart2:
         st.markdown("### 🎯 Model Distribution")
         
-        distribution_data = pd.DataFrame({
-            'Model': ['Flash (Simple)', 'Pro (Medium)', 'GPT-4 (Complex)'],
-            'Percentage': [68, 27, 5],
-            'Queries': [34000, 13500, 2500],
-            'Cost': [34, 270, 375]
-        })
-        
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=distribution_data['Model'],
-            values=distribution_data['Percentage'],
-            hole=.4,
-            marker=dict(colors=['#10b981', '#3b82f6', '#f59e0b']),
-            textinfo='label+percent',
-            textfont=dict(color='white')
-        )])
+        distribution_data = chart_data['distribution']
         
-        fig_pie.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            height=300,
-            showlegend=True
-        )
+        fig_pie = build_distribution_fig(distribution_data)
         st.plotly_chart(fig_pie, use_container_width=True)
     
     # Response Time Chart
@@ -236,38 +315,21 @@ with tab1:
     with col_chart3:
         st.markdown("### ⚡ Response Time Improvement")
         
-        response_data = pd.DataFrame({
-            'Category': ['Simple', 'Medium', 'Complex'],
-            'Before': [2.3, 3.1, 5.2],
-            'After': [0.8, 1.5, 4.8]
-        })
-        
-        fig_response = go.Figure(data=[
-            go.Bar(name='Before', x=response_data['Category'], y=response_data['Before'], marker_color='#ef4444'),
-            go.Bar(name='After', x=response_data['Category'], y=response_data['After'], marker_color='#10b981')
-        ])
+        response_data = chart_data['response']
         
-        fig_response.update_layout(
-            barmode='group',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', title='Seconds'),
-            height=300
-        )
+        fig_response = build_response_fig(response_data)
         st.plotly_chart(fig_response, use_container_width=True)
     
     with col_chart4:
         st.markdown("### 💰 Cost Breakdown (Monthly)")
         
-        for idx, row in distribution_data.iterrows():
+        for model, queries, cost in zip(distribution_data['Model'], distribution_data['Queries'], distribution_data['Cost']):
             col_a, col_b = st.columns([3, 1])
             with col_a:
-                st.markdown(f"**{row['Model']}**")
-                st.caption(f"{row['Queries']:,} queries")
+                st.markdown(f"**{model}**")
+                st.caption(f"{queries:,} queries")
             with col_b:
-                st.markdown(f"**${row['Cost']}**")
+                st.markdown(f"**${cost}**")
         
         st.markdown("---")
         st.markdown(f"### **Total: ${cascade_metrics['cost_after']}**")
@@ -369,42 +431,20 @@ with tab2:
     with col_qual1:
         st.markdown("### 🎯 Issue Detection & Resolution")
         
-        issues_data = pd.DataFrame({
-            'Issue Type': ['Format Violations', 'Missing Headers', 'Incomplete Sections', 'Safety Issues'],
-            'Detected': [187, 94, 31, 23],
-            'Fixed': [187, 94, 31, 23]
-        })
+        issues_data = chart_data['issues']
         
-        for idx, row in issues_data.iterrows():
-            st.markdown(f"**{row['Issue Type']}**")
-            st.caption(f"{row['Detected']} detected → {row['Fixed']} fixed")
+        for issue_type, detected, fixed in zip(issues_data['Issue Type'], issues_data['Detected'], issues_data['Fixed']):
+            st.markdown(f"**{issue_type}**")
+            st.caption(f"{detected} detected → {fixed} fixed")
             st.progress(100)
             st.markdown("")
     
     with col_qual2:
         st.markdown("### 📊 Iteration Distribution")
         
-        iteration_data = pd.DataFrame({
-            'Iterations': ['1 (Perfect)', '2', '3+'],
-            'Percentage': [72, 23, 5]
-        })
-        
-        fig_iter = go.Figure(data=[go.Bar(
-            x=iteration_data['Iterations'],
-            y=iteration_data['Percentage'],
-            marker_color=['#10b981', '#f59e0b', '#ef4444'],
-            text=iteration_data['Percentage'].apply(lambda x: f"{x}%"),
-            textposition='auto'
-        )])
+        iteration_data = chart_data['iteration']
         
-        fig_iter.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False, title='Number of Iterations'),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', title='Percentage'),
-            height=300
-        )
+        fig_iter = build_iteration_fig(iteration_data)
         st.plotly_chart(fig_iter, use_container_width=True)
     
     # Case Study
@@ -1,136 +1,577 @@
 import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import functools
+import sqlite3
+import tempfile
+from collections import OrderedDict
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from dotenv import load_dotenv
 
+from semantic_cache import SemanticIndex
+
+try:
+    import aiohttp
+except ImportError:  # optional: google-genai's async calls then go through httpx
+    aiohttp = None
+
 # 1. טעינת המפתח
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
+@functools.lru_cache(maxsize=1)
+def _api_key():
+    """GOOGLE_API_KEY from the environment / .env, read once per process"""
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+
+    if not api_key:
+        raise ValueError("❌ Error: GOOGLE_API_KEY not found in .env file")
+
+    return api_key
+
+@functools.lru_cache(maxsize=1)
+def _client():
+    """Shared genai client, built on first use so importing stays cheap"""
+    return genai.Client(api_key=_api_key())
+
+MODEL_ID = "gemini-2.5-flash"
+# The critic only emits "PASS" or a one-line FAIL reason; a lighter tier is enough
+CRITIC_MODEL_ID = "gemini-2.5-flash-lite"
+
+# Cap on in-flight API calls across concurrent loops (Gemini QPM limits)
+MAX_CONCURRENT_CALLS = 8
+# asyncio primitives bind to the loop that first waits on them, and each
+# asyncio.run() starts a new loop, so the semaphore is rebuilt per loop
+_api_slots_loop = None
+_api_slots_sem = None
+
+def _api_slots():
+    """Concurrency semaphore for the running event loop"""
+    global _api_slots_loop, _api_slots_sem
+    loop = asyncio.get_running_loop()
+    if loop is not _api_slots_loop:
+        _api_slots_loop, _api_slots_sem = loop, asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+    return _api_slots_sem
+
+# Per-attempt timeout and retry budget for each API call. The timeout is
+# sized for a full-length generator answer, not just a short verdict.
+API_TIMEOUT_SECONDS = 60
+API_MAX_ATTEMPTS = 3
+API_BACKOFF_SECONDS = 0.5
+
+# Connection resets/refusals from whichever async transport google-genai picked
+_TRANSPORT_ERRORS = (httpx.TransportError,) + ((aiohttp.ClientConnectionError,) if aiohttp else ())
+
+def _is_transient(exc):
+    """Timeouts, dropped connections, rate limits and server errors are worth retrying"""
+    if isinstance(exc, (asyncio.TimeoutError,) + _TRANSPORT_ERRORS):
+        return True
+    return isinstance(exc, errors.APIError) and (exc.code == 429 or exc.code >= 500)
+
+async def _call(coro_factory, timeout=API_TIMEOUT_SECONDS, max_attempts=API_MAX_ATTEMPTS):
+    """Await an API call with a timeout, retrying transient failures with exponential backoff"""
+    for attempt in range(max_attempts):
+        try:
+            # Timeout covers the call only, not the wait for a free slot
+            async with _api_slots():
+                return await asyncio.wait_for(coro_factory(), timeout)
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_transient(e):
+                raise
+        await asyncio.sleep(API_BACKOFF_SECONDS * 2 ** attempt)
+
+# --- Response Cache (exact match: in-memory LRU over SQLite) ---
+CACHE_DB_PATH = ".reflection_cache.sqlite3"
+CACHE_TTL_SECONDS = 24 * 60 * 60
+CACHE_MEMORY_ENTRIES = 256
+# Generator runs at temperature=1.0, so replaying its output is opt-in;
+# critic verdicts are rubric-style and always cached
+CACHE_GENERATOR = False
+
+class ResponseCache:
+    def __init__(self, path, ttl_seconds, memory_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._db = None  # opened on first use
+
+    def _conn(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+                )
+                # Reads skip expired rows; purge them here so the file doesn't grow forever
+                self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        return self._db
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] > now:
+            self._memory.move_to_end(key)
+            return entry[1]
+
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[1], row[0])
+        return row[0]
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, value)
+        with self._conn():
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+_response_cache = ResponseCache(CACHE_DB_PATH, CACHE_TTL_SECONDS, CACHE_MEMORY_ENTRIES)
+
+def _cache_key(model, contents, config):
+    payload = {"model": model, "prompt": contents, "cfg": config.model_dump(mode="json", exclude_none=True)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+async def _cached_generate(contents, config, model=MODEL_ID, cache=False):
+    """generate_content → text, served from the response cache when `cache` is set"""
+    key = _cache_key(model, contents, config) if cache else None
+    if key is not None:
+        hit = _response_cache.get(key)
+        if hit is not None:
+            return hit
+
+    response = await _call(lambda: _client().aio.models.generate_content(
+        model=model,
+        contents=contents,
+        config=config
+    ))
+    text = response.text
+    if text is None:
+        # Blocked prompt/response or no candidates: nothing to cache or judge
+        raise ValueError(f"Empty response from {model}")
+    if key is not None and text:
+        _response_cache.put(key, text)
+    return text
+
+# The critic fails any draft without "##". A draft that has run this many
+# characters of prose (outside code fences) without one is treated as
+# header-less: reading stops and that guardrail rejects the partial text.
+HEADER_CHECK_CHARS = 400
+
+def _headerless_prose_exceeded(text):
+    """True if `text` has no "##", no open ``` fence, and too much prose"""
+    if "##" in text:
+        return False
+    parts = text.split("```")
+    if len(parts) % 2 == 0:
+        return False  # inside a code block; a header may follow it
+    return sum(len(p) for p in parts[::2]) > HEADER_CHECK_CHARS
+
+async def _stream_generate(contents, config, model=MODEL_ID):
+    """generate_content_stream → text, cut short once the draft is clearly header-less"""
+    async def consume():
+        stream = await _client().aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config
+        )
+        chunks, header_pending = [], True
+        async for chunk in stream:
+            chunks.append(chunk.text or "")
+            if header_pending:
+                text = "".join(chunks)
+                if "##" in text:
+                    header_pending = False
+                elif _headerless_prose_exceeded(text):
+                    await stream.aclose()
+                    break
+        return "".join(chunks)
+
+    return await _call(consume)
+
+# --- Semantic Cache (approved answers for paraphrased queries) ---
+EMBEDDING_MODEL_ID = "gemini-embedding-001"
+SEMANTIC_CACHE_THRESHOLD = 0.9
+# Oldest approved answers are evicted beyond this (keeps the exact scan cheap)
+SEMANTIC_CACHE_MAX_ENTRIES = 1024
+
+_approved_responses = SemanticIndex(SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES)
+
+# embed_content takes a list of inputs, so lookups from concurrent loops
+# (run_many) are merged into one request per short window.
+EMBED_BATCH_MAX = 32
+EMBED_BATCH_WINDOW_SECONDS = 0.05
+# Endpoint-level failures (bad key, retired model): no later request can succeed
+_EMBED_FATAL_CODES = {401, 403, 404}
+
+class _BatchCoalescer:
+    """Collects embed requests and sends each window as one embed_content call"""
+
+    def __init__(self, max_items=EMBED_BATCH_MAX, window=EMBED_BATCH_WINDOW_SECONDS):
+        self.max_items = max_items
+        self.window = window
+        self._loop = None
+        self._pending = []  # (text, future)
+        self._timer = None
+        self._inflight = set()  # strong refs so flush tasks are not collected
+        self._dead = None  # fatal APIError; set once, later submits fail fast
+
+    async def submit(self, text):
+        if self._dead is not None:
+            raise self._dead
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Each asyncio.run() gets a new loop; drop state tied to the old one
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch):
+        try:
+            result = await _call(lambda: _client().aio.models.embed_content(
+                model=EMBEDDING_MODEL_ID,
+                contents=[text for text, _ in batch]
+            ))
+            if len(result.embeddings) != len(batch):
+                raise ValueError(f"expected {len(batch)} embeddings, got {len(result.embeddings)}")
+            for (_, future), embedding in zip(batch, result.embeddings):
+                if not future.done():
+                    future.set_result(embedding.values)
+        except Exception as e:
+            if isinstance(e, errors.APIError) and e.code in _EMBED_FATAL_CODES:
+                self._dead = e
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+_embedder = _BatchCoalescer()
+
+_embed_failure_reported = False
+
+async def _embed(text):
+    """Query embedding for the semantic cache (None if the call fails)"""
+    global _embed_failure_reported
+    try:
+        return await _embedder.submit(text)
+    except Exception as e:
+        # The cache is an optimization; never fail the loop over it, but
+        # report the first failure so a dead cache doesn't go unnoticed
+        if not _embed_failure_reported:
+            _embed_failure_reported = True
+            print(f"⚠️ Semantic cache unavailable ({EMBEDDING_MODEL_ID}): {e}")
+        return None
 
-if not api_key:
-    raise ValueError("❌ Error: GOOGLE_API_KEY not found in .env file")
+# --- Prompts: static system instruction, per-call fields as contents ---
+# The static block rides in the (shared, prebuilt) config, so it is built
+# once and sent byte-identical on every call. (It is far below the 1,024-token
+# minimum for Gemini's implicit caching, so no cache discount applies.)
+STATIC_GENERATOR_SYSTEM = (
+    "ROLE: Senior Technical Writer, enterprise software docs.\n"
+    "TASK: Answer the query in <user_query>.\n"
+    "RULES: Markdown H2/H3 headers. Paragraphs < 3 lines. Concise, factual.\n"
+)
 
-client = genai.Client(api_key=api_key)
+STATIC_CRITIC_SYSTEM = (
+    "ROLE: QA Auditor. Judge <generated_response> against <user_query>.\n"
+    "RUBRIC:\n"
+    "1. Accuracy: is the code logic correct?\n"
+    "2. Compliance override: Enterprise Standards require Markdown headers (##), even if the user asked for no text. "
+    "Headers (##) + code present -> PASS. Standards > user preference.\n"
+    "OUTPUT: first line is the bare word PASS, or \"FAIL: [brief reason]\". Nothing before it.\n"
+)
 
-generate_config = types.GenerateContentConfig(
+GENERATOR_CFG = types.GenerateContentConfig(
+    system_instruction=STATIC_GENERATOR_SYSTEM,
     temperature=1.0, 
     top_p=0.95,
     max_output_tokens=8192,
 )
 
-MODEL_ID = "gemini-2.5-flash"
+CRITIC_CFG = types.GenerateContentConfig(
+    system_instruction=STATIC_CRITIC_SYSTEM,
+    temperature=1.0, 
+    top_p=0.95,
+    max_output_tokens=64,
+)
+
+# evaluate_k: one critic sample per temperature, majority verdict wins
+CRITIC_VOTE_TEMPERATURES = (0.0, 0.4, 0.8)
+CRITIC_VOTE_CFGS = tuple(CRITIC_CFG.model_copy(update={"temperature": t}) for t in CRITIC_VOTE_TEMPERATURES)
 
 # --- Agent 1: The Generator ---
+def _generator_contents(user_query, previous_critique=None):
+    feedback = f"FIX (previous attempt failed): {previous_critique}\n" if previous_critique else ""
+    return f"{feedback}<user_query>\n{user_query}\n</user_query>"
+
 class GeneratorAgent:
-    def generate(self, user_query, previous_critique=None):
-        system_instruction = f"""
-        ### ROLE
-        You are a Senior Technical Writer tailored for Enterprise Software documentation.
-        
-        ### TASK
-        Answer the user query provided in <user_query> tags.
-        
-        ### CONTEXT & ADJUSTMENTS
-        {f'⚠️ PREVIOUS ATTEMPT FAILED. Critic Feedback: {previous_critique}. FIX THIS SPECIFICALLY.' if previous_critique else ''}
-        
-        ### POSITIVE PRESCRIPTIONS (Do this)
-        1. Use clear H2 and H3 headers (Markdown).
-        2. Keep paragraphs under 3 lines.
-        3. Be concise and factual.
-
-        ### INPUT DATA
-        <user_query>
-        {user_query}
-        </user_query>
-        """
+    async def generate(self, user_query, previous_critique=None):
+        """Draft text; API errors and timeouts propagate to the caller"""
+        contents = _generator_contents(user_query, previous_critique)
         
-        try:
-            response = client.models.generate_content(
-                model=MODEL_ID,
-                contents=system_instruction,
-                config=generate_config
-            )
-            return response.text
-        except Exception as e:
-            return f"Error generating content: {e}"
+        if CACHE_GENERATOR:
+            return await _cached_generate(contents, GENERATOR_CFG, cache=True)
+        return await _stream_generate(contents, GENERATOR_CFG)
 
 # --- Agent 2: The Hybrid Critic (המבקר ההיברידי) ---
+# Structure checks that settle the verdict without an LLM call
+_HEADER_RE = re.compile(r"^##+ ", re.M)
+_CODE_BLOCK_RE = re.compile(r"```[\s\S]+?```")
+# Verdict is PASS only if the first line is exactly "PASS" ("FAIL: ...bypasses..." is not)
+_PASS_RE = re.compile(r"\A\s*PASS\s*$", re.I | re.M)
+
 # --- Agent 2: The Hybrid Critic (המבקר המתוקן) ---
 class CriticAgent:
-    def evaluate(self, user_query, generated_response):
+    def __init__(self, model_id=CRITIC_MODEL_ID):
+        self.model_id = model_id
+
+    @staticmethod
+    def _structural_verdict(generated_response):
+        """PASS/FAIL decided by structure alone, or None if the LLM must judge"""
         # --- HARD GUARDRAIL (הגנה דטרמיניסטית) ---
         if "##" not in generated_response:
              return "FAIL: Compliance Violation - Missing Markdown Headers (##). Headers are mandatory."
 
+        # --- DETERMINISTIC PASS: headers + code is exactly the compliance override ---
+        if _HEADER_RE.search(generated_response) and _CODE_BLOCK_RE.search(generated_response):
+            return "PASS"
+        return None
+
+    async def _judge(self, user_query, generated_response, config):
+        contents = (
+            f"<user_query>\n{user_query}\n</user_query>\n"
+            f"<generated_response>\n{generated_response}\n</generated_response>"
+        )
+        return (await _cached_generate(contents, config, model=self.model_id, cache=True)).strip()
+
+    async def evaluate(self, user_query, generated_response):
+        verdict = self._structural_verdict(generated_response)
+        if verdict is not None:
+            return verdict
+
         # --- LLM EVALUATION ---
-        prompt = f"""
-        You are a QA Auditor. Review the Generated Response against the User Query.
-        
-        <user_query>
-        {user_query}
-        </user_query>
-
-        <generated_response>
-        {generated_response}
-        </generated_response>
-
-        ### STRICT EVALUATION RUBRIC
-        1. Accuracy: Is the code logic correct?
-        2. COMPLIANCE OVERRIDE: 
-           - The user asked for "no text", BUT Enterprise Standards require Markdown headers (##).
-           - If the response contains headers (##) and code, you must PASS it, even if the user asked for no text.
-           - Compliance with standards > User preference.
-
-        ### OUTPUT FORMAT
-        If PASS: Return exactly "PASS".
-        If FAIL: Return "FAIL: [Brief reason]".
+        return await self._judge(user_query, generated_response, CRITIC_CFG)
+
+    async def evaluate_k(self, user_query, generated_response):
         """
-        
+        Majority vote of concurrent critic samples (one per CRITIC_VOTE_TEMPERATURES)
+
+        Latency stays that of a single call; returns "PASS" or the first
+        FAIL critique, so the generator still gets concrete feedback.
+        Samples whose call failed are left out of the vote; raises only
+        if every sample failed.
+        """
+        verdict = self._structural_verdict(generated_response)
+        if verdict is not None:
+            return verdict
+
+        results = await asyncio.gather(
+            *(self._judge(user_query, generated_response, cfg) for cfg in CRITIC_VOTE_CFGS),
+            return_exceptions=True
+        )
+        critiques = [r for r in results if not isinstance(r, BaseException)]
+        if not critiques:
+            raise results[0]
+        failures = [c for c in critiques if not _PASS_RE.match(c)]
+        if len(failures) * 2 < len(critiques):
+            return "PASS"
+        return failures[0]
+
+# Agents are stateless; share one instance of each across loops
+_generator = GeneratorAgent()
+_critic = CriticAgent()
+
+# --- Batch Mode (offline evaluation runs) ---
+# Gemini Batch API: half the price of sync calls, but jobs are queued and
+# can take minutes to hours. Jobs are kept small to avoid long queue times.
+BATCH_MAX_REQUESTS = 200
+BATCH_POLL_SECONDS = 30
+_BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+def _submit_batch(queries):
+    """Upload one JSONL request file and start a batch job for it"""
+    generation_config = GENERATOR_CFG.model_dump(mode="json", exclude_none=True, exclude={"system_instruction"})
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        for i, query in enumerate(queries):
+            request = {
+                "contents": [{"role": "user", "parts": [{"text": _generator_contents(query)}]}],
+                "system_instruction": {"parts": [{"text": STATIC_GENERATOR_SYSTEM}]},
+                "generation_config": generation_config,
+            }
+            f.write(json.dumps({"key": f"q{i}", "request": request}) + "\n")
+    try:
+        uploaded = _client().files.upload(
+            file=f.name,
+            config=types.UploadFileConfig(display_name="reflection-gen", mime_type="jsonl")
+        )
+    finally:
+        os.remove(f.name)
+    return _client().batches.create(
+        model=MODEL_ID,
+        src=uploaded.name,
+        config=types.CreateBatchJobConfig(display_name="reflection-gen")
+    )
+
+def _collect_batch(job, queries):
+    """Wait for a batch job and map its results back to the queries"""
+    while job.state.name not in _BATCH_DONE_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        job = _client().batches.get(name=job.name)
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        print(f"⚠️ Batch job {job.name} ended in {job.state.name}")
+        return {}
+
+    drafts = {}
+    for line in _client().files.download(file=job.dest.file_name).decode("utf-8").splitlines():
+        item = json.loads(line)
         try:
-            response = client.models.generate_content(
-                model=MODEL_ID,
-                contents=prompt,
-                config=generate_config
-            )
-            return response.text.strip()
-        except Exception as e:
-            return f"Error evaluating content: {e}"
+            parts = item["response"]["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError):
+            continue  # per-request error; the loop falls back to a sync draft
+        drafts[queries[int(item["key"][1:])]] = "".join(p.get("text", "") for p in parts)
+    return drafts
+
+def batch_generate(queries):
+    """
+    First drafts for many queries through the Batch API (blocking)
+
+    Returns:
+        {query: draft} for every query the batch answered
+    """
+    chunks = [queries[i:i + BATCH_MAX_REQUESTS] for i in range(0, len(queries), BATCH_MAX_REQUESTS)]
+    jobs = [(_submit_batch(chunk), chunk) for chunk in chunks]
+
+    drafts = {}
+    for job, chunk in jobs:
+        drafts.update(_collect_batch(job, chunk))
+    return drafts
 
 # --- The Loop ---
-def reflection_loop(query):
+# Generic feedback for drafts started before the real critique is known
+SPECULATIVE_CRITIQUE = "Assume Markdown headers are missing or weak. Regenerate with strict H2/H3 structure."
+
+async def reflection_loop(query, speculative=False, draft=None, semantic_cache=True):
+    """
+    Generate → critique → regenerate until the critic passes the response
+
+    Args:
+        query: User request
+        speculative: Start the next draft while the critic is still
+            judging, hiding one generator round-trip per failed attempt.
+            The draft is discarded on PASS (its tokens are still billed),
+            and on FAIL it replaces the critique-specific retry.
+        draft: Precomputed first draft (e.g. from batch_generate);
+            skips the initial generator call
+        semantic_cache: Reuse approved answers for paraphrased queries
+            (costs one embedding round-trip per loop)
+    """
     print(f"\n🚀 Starting Reflection Loop for: '{query}'")
-    print(f"🤖 Using Model: {MODEL_ID}")
+    print(f"🤖 Using Model: {MODEL_ID} (critic: {CRITIC_MODEL_ID})")
     
-    generator = GeneratorAgent()
-    critic = CriticAgent()
+    generator = _generator
+    critic = _critic
     
     max_retries = 3
     current_try = 0
     
-    response = generator.generate(query)
+    # A paraphrase of an already-approved query skips generator and critic
+    embedding = await _embed(query) if semantic_cache else None
+    if embedding is not None:
+        cached = _approved_responses.search(embedding)
+        if cached is not None:
+            print("♻️ Semantic cache hit. Reusing approved output.")
+            return cached
     
-    # ✅ BUG FIX: בדיקה קפדנית יותר כדי לא ליפול על המילה ValueError בתוך קוד תקין
-    if response.startswith("Error generating"):
-        return response
+    # Agents raise on API failures (after _call's retries), dropped
+    # connections and empty responses. Any failed call, first draft or
+    # retry, ends this loop here with an error string instead of
+    # propagating (run_many's gather would lose every other result).
+    draft_task = None
+    try:
+        response = draft if draft is not None else await generator.generate(query)
 
-    while current_try < max_retries:
-        print(f"\n--- Attempt {current_try + 1} ---")
-        
-        critique = critic.evaluate(query, response)
-        print(f"🕵️ Critic Verdict: {critique}")
-        
-        if "PASS" in critique:
-            print("✅ Quality Assured. Final Output Ready.")
-            return response
+        while current_try < max_retries:
+            print(f"\n--- Attempt {current_try + 1} ---")
             
-        print("🔧 Fixing based on feedback...")
-        response = generator.generate(query, previous_critique=critique)
-        current_try += 1
+            critique_task = asyncio.create_task(critic.evaluate_k(query, response))
+            draft_task = None
+            if speculative and current_try + 1 < max_retries:
+                draft_task = asyncio.create_task(
+                    generator.generate(query, previous_critique=SPECULATIVE_CRITIQUE)
+                )
+            
+            critique = await critique_task
+            print(f"🕵️ Critic Verdict: {critique}")
+            
+            if _PASS_RE.match(critique):
+                print("✅ Quality Assured. Final Output Ready.")
+                if embedding is not None:
+                    _approved_responses.add(embedding, response)
+                return response
+            
+            # Out of attempts: a redraft now would never be judged
+            if current_try + 1 == max_retries:
+                break
+                
+            print("🔧 Fixing based on feedback...")
+            if draft_task is not None:
+                response = await draft_task
+            else:
+                response = await generator.generate(query, previous_critique=critique)
+            current_try += 1
+    except Exception as e:
+        return f"❌ ABORT: API call failed: {e}"
+    finally:
+        if draft_task is not None and not draft_task.done():
+            draft_task.cancel()
         
     return "❌ ABORT: Maximum retries reached."
 
+async def run_many(queries, batch=False, semantic_cache=True):
+    """
+    Run independent reflection loops concurrently; results in input order
+
+    Args:
+        batch: Produce first drafts through the Batch API (cheaper, but
+            slow to complete); retries still use sync calls
+        semantic_cache: Passed through to reflection_loop
+    """
+    drafts = await asyncio.to_thread(batch_generate, list(queries)) if batch else {}
+    return await asyncio.gather(
+        *(reflection_loop(q, draft=drafts.get(q), semantic_cache=semantic_cache) for q in queries)
+    )
+
 if __name__ == "__main__":
     # המלכודת נשארת: בקשה לקוד בלבד
     user_input = "Write a short Python function to calculate Fibonacci numbers. Just give me the code, no text." 
-    final_result = reflection_loop(user_input)
+    final_result = asyncio.run(reflection_loop(user_input))
     print("\nFINAL OUTPUT:\n" + final_result)
\ No newline at end of file
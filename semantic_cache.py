@@ -0,0 +1,136 @@
+"""
+Semantic Cache: Near-Duplicate Response Lookup
+==============================================
+
+Embedding index that lets paraphrased prompts reuse a previous answer
+instead of paying for another LLM round-trip.
+
+Small caches use an exact NumPy scan. Past ANN_MIN_ENTRIES, and if FAISS
+is installed, lookups go through an approximate index instead (HNSW on
+CPU, or a flat index on GPU when one is available).
+
+With max_entries set, the index is a fixed-size ring: once full, each
+add overwrites the oldest entry. Bounded indexes always use the exact
+scan, since the ANN indexes can't drop rows.
+
+Usage:
+    index = SemanticIndex(threshold=0.92)
+    index.add(embedding, response_text)
+    hit = index.search(other_embedding)  # response_text or None
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # optional: exact NumPy search is used at every size
+    faiss = None
+
+ANN_MIN_ENTRIES = 10_000   # below this, an exact scan is fast enough
+ANN_BATCH_SIZE = 256       # staged inserts per ANN index update
+HNSW_NEIGHBORS = 32
+
+
+def _normalize(embedding: Sequence[float]) -> np.ndarray:
+    """Unit-length float32 vector, so a dot product is cosine similarity"""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def _build_ann_index(dim: int):
+    """GPU flat index if a GPU is visible, else CPU HNSW (inner product)"""
+    if hasattr(faiss, 'StandardGpuResources') and faiss.get_num_gpus() > 0:
+        return faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, faiss.IndexFlatIP(dim))
+    return faiss.IndexHNSWFlat(dim, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+
+
+class SemanticIndex:
+    """
+    Cosine-similarity lookup over previously answered queries
+
+    Stores one normalized embedding per cached value and returns the
+    value of the closest entry when it clears the similarity threshold.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: Optional[int] = None):
+        """
+        Args:
+            threshold: Minimum cosine similarity counted as a hit
+            max_entries: Evict oldest entries beyond this many (None = unbounded)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._oldest = 0  # next row to overwrite once a bounded index is full
+        self._vectors: Optional[np.ndarray] = None  # grown by doubling
+        self._values: List[Any] = []
+        self._ann = None
+        self._ann_count = 0  # rows already added to the ANN index
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, embedding: Sequence[float], value: Any) -> None:
+        """Remember `value` as the answer for `embedding`"""
+        vec = _normalize(embedding)
+        size = len(self._values)
+        if self.max_entries is not None and size >= self.max_entries:
+            row = self._oldest
+            self._vectors[row] = vec
+            self._values[row] = value
+            self._oldest = (row + 1) % self.max_entries
+            return
+
+        if self._vectors is None:
+            self._vectors = np.empty((64, vec.shape[0]), dtype=np.float32)
+        elif size == self._vectors.shape[0]:
+            self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+        self._vectors[size] = vec
+        self._values.append(value)
+
+        if faiss is not None and self.max_entries is None and size + 1 - self._ann_count >= ANN_BATCH_SIZE:
+            self._sync_ann()
+
+    def _sync_ann(self) -> None:
+        """Move staged rows into the ANN index once the cache is large enough"""
+        size = len(self._values)
+        if size < ANN_MIN_ENTRIES:
+            return
+        if self._ann is None:
+            self._ann = _build_ann_index(self._vectors.shape[1])
+        self._ann.add(self._vectors[self._ann_count:size])
+        self._ann_count = size
+
+    def _best_match(self, query: np.ndarray) -> Tuple[int, float]:
+        """(row, similarity) of the nearest cached embedding"""
+        size = len(self._values)
+        best, best_sim = -1, -np.inf
+
+        start = 0
+        if self._ann is not None:
+            similarities, rows = self._ann.search(query[None, :], 1)
+            best, best_sim = int(rows[0, 0]), float(similarities[0, 0])
+            start = self._ann_count  # rows staged since the last sync
+
+        if start < size:
+            similarities = self._vectors[start:size] @ query
+            row = int(np.argmax(similarities))
+            if similarities[row] > best_sim:
+                best, best_sim = start + row, float(similarities[row])
+        return best, best_sim
+
+    def search(self, embedding: Sequence[float]) -> Optional[Any]:
+        """
+        Find the closest cached value
+
+        Returns:
+            Cached value if max similarity >= threshold, else None
+        """
+        if not self._values:
+            return None
+
+        best, similarity = self._best_match(_normalize(embedding))
+        if best >= 0 and similarity >= self.threshold:
+            return self._values[best]
+        return None